@@ -1,12 +1,20 @@
+import hashlib
 import json
 import os
 import random
+import secrets
+import shutil
+import tempfile
+import threading
 import time
 import uuid
+from collections import OrderedDict
 
+import orjson
 from flask import (
     Flask,
     flash,
+    g,
     redirect,
     render_template,
     request,
@@ -31,75 +39,356 @@ os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 _SESSION_DIR = os.path.join(os.path.dirname(__file__), "uploads", ".sessions")
 os.makedirs(_SESSION_DIR, exist_ok=True)
 
+# Recently used session files stay in memory (as their written bytes) so a page
+# view doesn't have to re-read the file. The file's mtime tracks last access,
+# refreshed at most every _SESSION_TOUCH_INTERVAL seconds.
+_SESSION_CACHE = OrderedDict()  # sid -> ((inode, mtime_ns, size), file bytes)
+_SESSION_CACHE_SIZE = 256
+_SESSION_LOCK = threading.Lock()
+_SESSION_TOUCH_INTERVAL = 60
+
+# Text extracted from uploads, keyed by a hash of the file contents
+_TEXT_CACHE_DIR = os.path.join(app.config["UPLOAD_FOLDER"], ".textcache")
+os.makedirs(_TEXT_CACHE_DIR, exist_ok=True)
+
+# Expired sessions are swept at most this often, in a background timer
+_CLEANUP_INTERVAL = 300
+_LAST_CLEANUP = [0.0]
+
 
 def _session_path(sid):
     """Return the file path for a given session ID."""
     return os.path.join(_SESSION_DIR, f"{sid}.json")
 
 
+def _file_stamp(path):
+    """Return (inode, mtime_ns, size) for a file, used to spot rewrites of a cached session.
+
+    Every save replaces the file with a new one, so the inode changes even if
+    two saves land within the same mtime tick.
+    """
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _cache_session(sid, raw, stamp):
+    """Remember a session file's bytes in memory, evicting the least recently used."""
+    with _SESSION_LOCK:
+        _SESSION_CACHE[sid] = (stamp, raw)
+        _SESSION_CACHE.move_to_end(sid)
+        while len(_SESSION_CACHE) > _SESSION_CACHE_SIZE:
+            _SESSION_CACHE.popitem(last=False)
+
+
+def _load_session(sid):
+    """Return the data for a stored session, or None if it is missing or corrupt.
+
+    The file's bytes are kept in memory as long as it hasn't been rewritten
+    since they were cached, saving the disk read. Each call parses them into a
+    fresh dict, so changes a request makes only last if they are saved.
+    Bumping the file's mtime marks the session as active.
+    """
+    path = _session_path(sid)
+    try:
+        stamp = _file_stamp(path)
+        with _SESSION_LOCK:
+            cached = _SESSION_CACHE.get(sid)
+        if cached and cached[0] == stamp:
+            raw = cached[1]
+        else:
+            with open(path, "rb") as f:
+                raw = f.read()
+            # Only cache the bytes under a stamp known to describe them; if
+            # another request or worker replaced the file meanwhile, skip it
+            if _file_stamp(path) == stamp:
+                _cache_session(sid, raw, stamp)
+        data = orjson.loads(raw)["data"]
+        # Touching changes the stamp, so the next load re-reads the file
+        if time.time_ns() - stamp[1] > _SESSION_TOUCH_INTERVAL * 1_000_000_000:
+            os.utime(path, None)
+        return data
+    except (orjson.JSONDecodeError, KeyError, TypeError, OSError):
+        return None
+
+
 def get_session_data():
     sid = session.get("sid")
 
-    # Try to load existing session from disk
+    # Try to load existing session from memory or disk
     if sid:
-        path = _session_path(sid)
-        if os.path.exists(path):
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    store = json.load(f)
-                store["timestamp"] = time.time()
-                _save_session(sid, store)
-                return store["data"]
-            except (json.JSONDecodeError, OSError):
-                pass  # Corrupt file, create fresh session
+        data = _load_session(sid)
+        if data is not None:
+            return data
 
     # Create new session
     sid = str(uuid.uuid4())
     session["sid"] = sid
-    store = {"data": {}, "timestamp": time.time()}
-    _save_session(sid, store)
-    return store["data"]
+    data = {}
+    save_session_data(data)
+    return data
 
 
-def _save_session(sid, store):
-    """Write session data to disk."""
+def _full_text_path(sid):
+    """Return the path of the file holding a session's full bulletin text."""
+    return os.path.join(_SESSION_DIR, f"{sid}.fulltext.txt")
+
+
+def save_full_text(text):
+    """Store the full bulletin text beside the current session and return its path.
+
+    It can be tens of KB, so it is kept out of the session JSON that gets
+    rewritten on every save. Call after get_session_data().
+    """
+    path = _full_text_path(session["sid"])
     try:
-        with open(_session_path(sid), "w", encoding="utf-8") as f:
-            json.dump(store, f)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
     except OSError:
-        pass
+        return None
+    return path
+
+
+def _save_session(sid, store):
+    """Atomically write session data to disk and refresh the in-memory copy.
+
+    Each save writes its own temp file, so concurrent saves of one session
+    can't clobber each other mid-write; the last replace wins.
+    """
+    path = _session_path(sid)
+    tmp_path = None
+    try:
+        raw = orjson.dumps(store)
+        fd, tmp_path = tempfile.mkstemp(dir=_SESSION_DIR, prefix=f"{sid}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+        # Stamp the temp file: os.replace keeps its inode and mtime, and the
+        # target may already have been replaced again by the time we stat it
+        stamp = _file_stamp(tmp_path)
+        os.replace(tmp_path, path)
+        _cache_session(sid, raw, stamp)
+    except (orjson.JSONEncodeError, OSError):
+        # Leave the previous session file in place and re-read it next time
+        with _SESSION_LOCK:
+            _SESSION_CACHE.pop(sid, None)
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
 
 
 def save_session_data(data):
-    """Persist current session data to disk. Call after modifying data."""
+    """Mark session data as changed. Call after modifying data.
+
+    The write happens once, after the response is built, however many times
+    this is called during the request.
+    """
     sid = session.get("sid")
     if sid:
-        store = {"data": data, "timestamp": time.time()}
-        _save_session(sid, store)
+        g.setdefault("dirty_sessions", {})[sid] = data
 
 
-def cleanup_sessions(max_age=3600):
-    now = time.time()
+@app.after_request
+def _flush_sessions(response):
+    """Write any sessions changed during this request to disk."""
+    for sid, data in g.pop("dirty_sessions", {}).items():
+        _save_session(sid, {"data": data, "timestamp": time.time()})
+    return response
+
+
+def _remove_stale_files(directory, max_age, now):
+    """Delete files in directory not modified in max_age seconds."""
     try:
-        for fname in os.listdir(_SESSION_DIR):
-            fpath = os.path.join(_SESSION_DIR, fname)
+        for fname in os.listdir(directory):
+            fpath = os.path.join(directory, fname)
             try:
-                with open(fpath, "r", encoding="utf-8") as f:
-                    store = json.load(f)
-                if now - store.get("timestamp", 0) > max_age:
+                if now - os.stat(fpath).st_mtime > max_age:
                     os.remove(fpath)
-            except (json.JSONDecodeError, OSError):
-                os.remove(fpath)
+            except OSError:
+                pass
     except OSError:
         pass
 
 
+def _expire_sessions(max_age, now):
+    """Delete sessions idle for max_age seconds, along with their sidecar files.
+
+    Only the <sid>.json file is touched on each request, so it decides when
+    the other <sid>.* files go too.
+    """
+    try:
+        fnames = os.listdir(_SESSION_DIR)
+    except OSError:
+        return
+    live = set()
+    for fname in fnames:
+        if fname.endswith(".json"):
+            sid = fname[:-len(".json")]
+            try:
+                if now - os.stat(os.path.join(_SESSION_DIR, fname)).st_mtime <= max_age:
+                    live.add(sid)
+            except OSError:
+                pass
+    for fname in fnames:
+        sid = fname.split(".", 1)[0]
+        if sid in live:
+            continue
+        fpath = os.path.join(_SESSION_DIR, fname)
+        try:
+            # A sidecar may briefly exist before its session is first written
+            if fname.endswith(".json") or now - os.stat(fpath).st_mtime > max_age:
+                os.remove(fpath)
+        except OSError:
+            pass
+        with _SESSION_LOCK:
+            _SESSION_CACHE.pop(sid, None)
+
+
+def cleanup_sessions(max_age=3600):
+    """Delete sessions and cached bulletin text untouched in max_age seconds."""
+    now = time.time()
+    if now - _LAST_CLEANUP[0] < _CLEANUP_INTERVAL:
+        return
+    _LAST_CLEANUP[0] = now
+    _expire_sessions(max_age, now)
+    _remove_stale_files(_TEXT_CACHE_DIR, max_age, now)
+
+
+def _schedule_cleanup():
+    """Sweep expired sessions now, then again every _CLEANUP_INTERVAL seconds."""
+    cleanup_sessions()
+    timer = threading.Timer(_CLEANUP_INTERVAL, _schedule_cleanup)
+    timer.daemon = True
+    timer.start()
+
+
+_schedule_cleanup()
+
+
+# --- Uploads ---
+
+
+def _describe_formats(exts):
+    """Return (accept attribute, human-readable format list) for the upload form."""
+    accept_str = ",".join(f".{e}" for e in sorted(exts))
+    # Build human-readable format list (e.g. "PDF, Word (.docx), or Text (.txt)")
+    labels = []
+    if "pdf" in exts:
+        labels.append("PDF")
+    if "doc" in exts and "docx" in exts:
+        labels.append("Word (.doc/.docx)")
+    elif "docx" in exts:
+        labels.append("Word (.docx)")
+    if "txt" in exts:
+        labels.append("Text (.txt)")
+    format_text = ", ".join(labels[:-1]) + ", or " + labels[-1] if len(labels) > 1 else labels[0]
+    return accept_str, format_text
+
+
+# The allowed extensions never change at runtime, so describe them once
+_ACCEPT_STR, _FORMAT_TEXT = _describe_formats(Config.ALLOWED_EXTENSIONS)
+_EXT_LIST = ", ".join(f".{e}" for e in sorted(Config.ALLOWED_EXTENSIONS))
+
+# Copy uploads in 64KB chunks rather than FileStorage.save's 16KB default
+_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _upload_path(filename):
+    """Return a unique path in the upload folder for a user-supplied filename."""
+    return os.path.join(app.config["UPLOAD_FOLDER"], f"{secrets.token_hex(8)}_{secure_filename(filename)}")
+
+
+def _save_upload(file, path):
+    """Write an uploaded file to disk."""
+    with open(path, "wb", buffering=_UPLOAD_CHUNK_SIZE) as out:
+        shutil.copyfileobj(file.stream, out, _UPLOAD_CHUNK_SIZE)
+
+
+def _file_digest(path):
+    """Return a BLAKE2b hex digest of a file's contents."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_UPLOAD_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _extract_text_cached(filepath):
+    """Extract text from an uploaded file, reusing the result for identical uploads."""
+    ext = os.path.splitext(filepath)[1].lower()
+    cache_path = os.path.join(_TEXT_CACHE_DIR, f"{_file_digest(filepath)}{ext}.txt")
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        pass  # Not seen before
+
+    text = file_parser.extract_text(filepath)
+
+    # Write to a temp file first so a failed write never leaves a partial entry
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, cache_path)
+    except (OSError, UnicodeError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return text
+
+
+def _keep_for_retry(filepath):
+    """Move an upload beside the session so bingo_upload_retry can re-parse it."""
+    data = get_session_data()
+    _discard_retry_upload(data)
+    ext = os.path.splitext(filepath)[1].lower()
+    retry_path = os.path.join(_SESSION_DIR, f"{session['sid']}.retry{ext}")
+    try:
+        os.replace(filepath, retry_path)
+    except OSError:
+        return
+    data["retry_upload"] = retry_path
+    save_session_data(data)
+
+
+def _discard_retry_upload(data):
+    """Delete an upload kept for retry, if any."""
+    retry_path = data.pop("retry_upload", None)
+    if retry_path and os.path.exists(retry_path):
+        os.remove(retry_path)
+
+
+def _use_bulletin_text(text):
+    """Pick words out of extracted bulletin text and move on to the words step."""
+    # Extract words via Claude
+    words = word_extractor.extract_words(text)
+
+    # Compute word frequencies from the full bulletin text
+    word_counts = word_extractor.compute_word_frequencies(text, words)
+
+    # Only keep words that appear more than once in the bulletin,
+    # then sort by frequency (most frequent first)
+    words = [w for w in words if word_counts.get(w, 0) > 1]
+    words.sort(key=lambda w: word_counts.get(w, 0), reverse=True)
+
+    data = get_session_data()
+    _discard_retry_upload(data)
+    data["extracted_text"] = text[:2000]  # Store a snippet for reference
+    data["full_text_path"] = save_full_text(text)  # Kept for frequency recalculation
+    data["suggested_words"] = words
+    data["selected_words"] = words[:]  # Copy - all selected by default
+    data["word_counts"] = word_counts
+    save_session_data(data)
+
+    flash(f"Found {len(words)} words from your bulletin!", "success")
+    return redirect(url_for("bingo_words"))
+
+
 # --- Routes ---
 
 
 @app.route("/")
 def index():
-    cleanup_sessions()
     return render_template("index.html")
 
 
@@ -109,20 +398,16 @@ def index():
 @app.route("/bingo/upload", methods=["GET", "POST"])
 def bingo_upload():
     if request.method == "GET":
-        exts = Config.ALLOWED_EXTENSIONS
-        accept_str = ",".join(f".{e}" for e in sorted(exts))
-        # Build human-readable format list (e.g. "PDF, Word (.docx), or Text (.txt)")
-        labels = []
-        if "pdf" in exts:
-            labels.append("PDF")
-        if "doc" in exts and "docx" in exts:
-            labels.append("Word (.doc/.docx)")
-        elif "docx" in exts:
-            labels.append("Word (.docx)")
-        if "txt" in exts:
-            labels.append("Text (.txt)")
-        format_text = ", ".join(labels[:-1]) + ", or " + labels[-1] if len(labels) > 1 else labels[0]
-        return render_template("bingo/upload.html", step=1, accept_str=accept_str, format_text=format_text)
+        # Only look up the session if there is one, to avoid creating it here
+        retry_path = get_session_data().get("retry_upload") if "sid" in session else None
+        can_retry = bool(retry_path) and os.path.exists(retry_path)
+        return render_template(
+            "bingo/upload.html",
+            step=1,
+            accept_str=_ACCEPT_STR,
+            format_text=_FORMAT_TEXT,
+            can_retry=can_retry,
+        )
 
     # Handle file upload
     if "bulletin" not in request.files:
@@ -135,44 +420,24 @@ def bingo_upload():
         return redirect(url_for("bingo_upload"))
 
     if not file_parser.allowed_file(file.filename, Config.ALLOWED_EXTENSIONS):
-        ext_list = ", ".join(f".{e}" for e in sorted(Config.ALLOWED_EXTENSIONS))
-        flash(f"Unsupported file type. Please upload one of: {ext_list}", "danger")
+        flash(f"Unsupported file type. Please upload one of: {_EXT_LIST}", "danger")
         return redirect(url_for("bingo_upload"))
 
     # Save file temporarily
-    filename = secure_filename(file.filename)
-    unique_name = f"{uuid.uuid4().hex}_{filename}"
-    filepath = os.path.join(app.config["UPLOAD_FOLDER"], unique_name)
-    file.save(filepath)
+    filepath = _upload_path(file.filename)
+    _save_upload(file, filepath)
 
     try:
         # Extract text
-        text = file_parser.extract_text(filepath)
+        text = _extract_text_cached(filepath)
         if not text or len(text.strip()) < 20:
+            # Hold on to the file so it can be retried without re-uploading
+            if file_parser.has_alternate_parser(filepath):
+                _keep_for_retry(filepath)
             flash("Could not extract enough text from the file. Try a different file or enter words manually.", "warning")
             return redirect(url_for("bingo_upload"))
 
-        # Extract words via Claude
-        words = word_extractor.extract_words(text)
-
-        # Compute word frequencies from the full bulletin text
-        word_counts = word_extractor.compute_word_frequencies(text, words)
-
-        # Only keep words that appear more than once in the bulletin,
-        # then sort by frequency (most frequent first)
-        words = [w for w in words if word_counts.get(w, 0) > 1]
-        words.sort(key=lambda w: word_counts.get(w, 0), reverse=True)
-
-        data = get_session_data()
-        data["extracted_text"] = text[:2000]  # Store a snippet for reference
-        data["full_text"] = text  # Store full text for frequency recalculation
-        data["suggested_words"] = words
-        data["selected_words"] = words[:]  # Copy - all selected by default
-        data["word_counts"] = word_counts
-        save_session_data(data)
-
-        flash(f"Found {len(words)} words from your bulletin!", "success")
-        return redirect(url_for("bingo_words"))
+        return _use_bulletin_text(text)
 
     except ValueError as e:
         flash(str(e), "danger")
@@ -186,6 +451,33 @@ def bingo_upload():
             os.remove(filepath)
 
 
+@app.route("/bingo/upload/retry", methods=["POST"])
+def bingo_upload_retry():
+    data = get_session_data()
+    filepath = data.get("retry_upload")
+    if not filepath or not os.path.exists(filepath):
+        flash("Your last upload is no longer available. Please upload the file again.", "warning")
+        return redirect(url_for("bingo_upload"))
+
+    try:
+        text = file_parser.extract_text(filepath, alternate=True)
+        if not text or len(text.strip()) < 20:
+            # Both parsers have had a go, so don't offer the retry again
+            _discard_retry_upload(data)
+            save_session_data(data)
+            flash("Still could not extract enough text from the file. Try a different file or enter words manually.", "warning")
+            return redirect(url_for("bingo_upload"))
+
+        return _use_bulletin_text(text)
+
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("bingo_upload"))
+    except Exception as e:
+        flash(f"Error processing bulletin: {str(e)}", "danger")
+        return redirect(url_for("bingo_upload"))
+
+
 @app.route("/bingo/manual-words", methods=["POST"])
 def bingo_manual_words():
     text = request.form.get("manual_text", "").strip()
@@ -222,9 +514,10 @@ def bingo_manual_words():
     words.sort(key=lambda w: word_counts.get(w, 0), reverse=True)
 
     data = get_session_data()
+    _discard_retry_upload(data)
     data["suggested_words"] = words
     data["selected_words"] = words[:]
-    data["full_text"] = text
+    data["full_text_path"] = save_full_text(text)
     data["word_counts"] = word_counts
     save_session_data(data)
 
@@ -235,6 +528,17 @@ def bingo_manual_words():
 # --- BINGO: Step 2 - Words ---
 
 
+def _parse_word_list(raw):
+    """Parse a JSON list of words from a form field, or [] if it isn't one."""
+    try:
+        words = json.loads(raw)
+    except json.JSONDecodeError:
+        return []
+    if not isinstance(words, list) or not all(isinstance(w, str) for w in words):
+        return []
+    return words
+
+
 @app.route("/bingo/words", methods=["GET", "POST"])
 def bingo_words():
     data = get_session_data()
@@ -249,11 +553,7 @@ def bingo_words():
         return render_template("bingo/words.html", step=2, words=words, word_counts=word_counts)
 
     # POST - save selected words
-    selected_json = request.form.get("selected_words", "[]")
-    try:
-        selected = json.loads(selected_json)
-    except json.JSONDecodeError:
-        selected = []
+    selected = _parse_word_list(request.form.get("selected_words", "[]"))
 
     if len(selected) < 16:
         flash(f"You need at least 16 words. Currently have {len(selected)}.", "warning")
@@ -263,11 +563,7 @@ def bingo_words():
     data["selected_words"] = selected
 
     # Track which words were manually added so they always appear on cards
-    custom_json = request.form.get("custom_words", "[]")
-    try:
-        data["custom_words"] = json.loads(custom_json)
-    except json.JSONDecodeError:
-        data["custom_words"] = []
+    data["custom_words"] = _parse_word_list(request.form.get("custom_words", "[]"))
 
     save_session_data(data)
     return redirect(url_for("bingo_configure"))
@@ -374,9 +670,8 @@ def bingo_customize():
     if "logo" in request.files:
         logo_file = request.files["logo"]
         if logo_file.filename:
-            logo_name = secure_filename(logo_file.filename)
-            logo_path = os.path.join(app.config["UPLOAD_FOLDER"], f"{uuid.uuid4().hex}_{logo_name}")
-            logo_file.save(logo_path)
+            logo_path = _upload_path(logo_file.filename)
+            _save_upload(logo_file, logo_path)
             # Remove old logo if exists
             if data.get("logo_path") and os.path.exists(data["logo_path"]):
                 os.remove(data["logo_path"])
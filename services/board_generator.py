@@ -1,3 +1,5 @@
+import functools
+import math
 import random
 
 
@@ -31,20 +33,40 @@ def generate_boards(words, board_size, card_count, word_mode, custom_words=None)
     guaranteed = [w for w in (custom_words or []) if w in words]
     remaining_pool = [w for w in words if w not in guaranteed]
 
+    # The number of filler words is the same for every card, so work it out once
+    fill_needed = cells_needed - len(guaranteed)
+    if word_mode != "same_shuffled":
+        fill_needed = min(fill_needed, len(remaining_pool))
+
+    if word_mode == "same_shuffled":
+        # Cards differ only in arrangement. With 16+ cells a repeated
+        # arrangement is so unlikely that checking for one isn't worth it.
+        board_key = tuple
+        key_limit = _factorial_limit(cells_needed)
+        check_duplicates = card_count * card_count >= math.factorial(cells_needed) / 1000
+    else:
+        # Cards should differ in which words they use, not just their order
+        board_key = frozenset
+        key_limit = math.comb(len(remaining_pool), fill_needed)
+        check_duplicates = card_count <= key_limit
+
+    if not check_duplicates:
+        # One draw per card, no retry loop
+        for _ in range(card_count):
+            card_words = guaranteed + random.sample(remaining_pool, fill_needed)
+            random.shuffle(card_words)
+            boards.append(_build_grid(card_words, board_size))
+        return boards
+
     for _ in range(card_count):
         attempts = 0
         while attempts < 100:
-            fill_needed = cells_needed - len(guaranteed)
-            if word_mode == "same_shuffled":
-                filler = random.sample(remaining_pool, fill_needed)
-            else:
-                filler = random.sample(remaining_pool, min(fill_needed, len(remaining_pool)))
-            card_words = guaranteed + filler
+            card_words = guaranteed + random.sample(remaining_pool, fill_needed)
             random.shuffle(card_words)
 
-            board_key = tuple(card_words)
-            if board_key not in seen or card_count > _factorial_limit(cells_needed):
-                seen.add(board_key)
+            key = board_key(card_words)
+            if key not in seen or card_count > key_limit:
+                seen.add(key)
                 break
             attempts += 1
 
@@ -55,20 +77,14 @@ def generate_boards(words, board_size, card_count, word_mode, custom_words=None)
 
 
 def _build_grid(words_for_card, board_size):
-    grid = []
-    idx = 0
-    for row in range(board_size):
-        row_cells = []
-        for col in range(board_size):
-            if board_size == 5 and row == 2 and col == 2:
-                row_cells.append("FREE")
-            else:
-                row_cells.append(words_for_card[idx])
-                idx += 1
-        grid.append(row_cells)
-    return grid
+    cells = list(words_for_card)
+    if board_size == 5:
+        # Free space in the center square
+        cells.insert(12, "FREE")
+    return [cells[i:i + board_size] for i in range(0, board_size * board_size, board_size)]
 
 
+@functools.lru_cache(maxsize=None)
 def _factorial_limit(n):
     """Return a reasonable upper limit to avoid checking too many permutations."""
     result = 1
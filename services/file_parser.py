@@ -1,34 +1,95 @@
 import os
+import threading
 
 from pypdf import PdfReader
 from docx import Document
 
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None  # Fall back to pypdf for PDFs
+
+# PDFium isn't thread-safe, so only one request thread may use it at a time
+_PDFIUM_LOCK = threading.Lock()
+
+# Stop reading a PDF after this many pages or characters. Only the first few
+# thousand characters are sent to Claude, so huge documents gain nothing.
+MAX_PDF_PAGES = 50
+MAX_PDF_CHARS = 200_000
+
 
 def allowed_file(filename, allowed_extensions):
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in allowed_extensions
+    _, dot, ext = filename.rpartition(".")
+    return bool(dot) and ext.lower() in allowed_extensions
 
 
-def extract_text(filepath):
+def extract_text(filepath, alternate=False):
+    """Extract text from a file based on its extension.
+
+    With alternate=True, use the backup parser for the format instead (see
+    has_alternate_parser), for files the usual parser got little text from.
+    """
     ext = os.path.splitext(filepath)[1].lower()
-    if ext == ".pdf":
-        return _extract_from_pdf(filepath)
-    elif ext == ".docx":
-        return _extract_from_docx(filepath)
-    elif ext == ".doc":
-        return _extract_from_doc(filepath)
-    elif ext == ".txt":
-        return _extract_from_txt(filepath)
-    else:
+    try:
+        extractor = (_ALTERNATE_EXTRACTORS if alternate else _EXTRACTORS)[ext[1:]]
+    except KeyError:
         raise ValueError(f"Unsupported file type: {ext}")
+    return extractor(filepath)
+
+
+def has_alternate_parser(filepath):
+    """Return True if there is a second parser to retry this file with."""
+    return os.path.splitext(filepath)[1].lower()[1:] in _ALTERNATE_EXTRACTORS
 
 
-def _extract_from_pdf(filepath):
+def _extract_from_pdf(filepath, max_pages=MAX_PDF_PAGES):
+    """Extract text from up to max_pages pages of a PDF.
+
+    Uses pypdfium2 (native PDFium) when installed, which is much faster than
+    pypdf on multi-page bulletins. Falls back to pypdf if it is unavailable
+    or can't read the file.
+    """
+    if pdfium is not None:
+        try:
+            return _extract_from_pdf_pdfium(filepath, max_pages)
+        except pdfium.PdfiumError:
+            pass  # Let pypdf have a try
+    return _extract_from_pdf_pypdf(filepath, max_pages)
+
+
+def _extract_from_pdf_pdfium(filepath, max_pages=MAX_PDF_PAGES):
+    parts = []
+    total = 0
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(filepath)
+        try:
+            for i in range(min(len(pdf), max_pages)):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                text = textpage.get_text_range()
+                textpage.close()
+                page.close()
+                if text:
+                    parts.append(text.replace("\r\n", "\n"))
+                    total += len(text)
+                    if total > MAX_PDF_CHARS:
+                        break
+        finally:
+            pdf.close()
+    return "\n".join(parts)
+
+
+def _extract_from_pdf_pypdf(filepath, max_pages=MAX_PDF_PAGES):
     reader = PdfReader(filepath)
     parts = []
-    for page in reader.pages:
+    total = 0
+    for i, page in enumerate(reader.pages):
+        if i >= max_pages or total > MAX_PDF_CHARS:
+            break
         text = page.extract_text()
         if text:
             parts.append(text)
+            total += len(text)
     return "\n".join(parts)
 
 
@@ -92,3 +153,16 @@ def _extract_from_doc(filepath):
 def _extract_from_txt(filepath):
     with open(filepath, "r", encoding="utf-8", errors="replace") as f:
         return f.read()
+
+
+# Extension (without the dot) -> extractor
+_EXTRACTORS = {
+    "pdf": _extract_from_pdf,
+    "docx": _extract_from_docx,
+    "doc": _extract_from_doc,
+    "txt": _extract_from_txt,
+}
+
+# Backup parsers to retry with when the usual one finds too little text.
+# PDFs are read with pypdfium2 first, so pypdf is only a real alternative then.
+_ALTERNATE_EXTRACTORS = {"pdf": _extract_from_pdf_pypdf} if pdfium is not None else {}
@@ -1,7 +1,11 @@
+import functools
+import os
 from datetime import datetime
 from io import BytesIO
 
+from PIL import Image as PILImage
 from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.units import inch
 from reportlab.lib.colors import HexColor
 from reportlab.lib import colors
@@ -17,6 +21,18 @@ from reportlab.platypus import (
 from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.enums import TA_CENTER
 
+# Boards span the usable page width (after margins) in square cells. Column
+# widths double as row heights; precomputed for the supported board sizes.
+_BOARD_WIDTH = letter[0] - 1.5 * inch
+_CELL_SIZES = {size: [_BOARD_WIDTH / size] * size for size in (4, 5)}
+
+# Separator between the parts of each card's footer line
+_FOOTER_SEP = " &nbsp;&bull;&nbsp; "
+
+# Logos are drawn at most this size (inches) and embedded at this resolution
+_LOGO_MAX_SIZE = 0.8 * inch
+_LOGO_DPI = 300
+
 
 def _ordinal(n):
     """Return ordinal string for an integer (1st, 2nd, 3rd, 4th, ...)."""
@@ -27,6 +43,7 @@ def _ordinal(n):
     return f"{n}{suffix}"
 
 
+@functools.lru_cache(maxsize=256)
 def format_date(date_str):
     """Convert YYYY-MM-DD to 'Sunday, February 6th, 2026' format.
 
@@ -56,10 +73,18 @@ def generate_pdf(
     card_date="",
     card_occasion="",
     footer_message="",
+    output=None,
 ):
-    buffer = BytesIO()
+    """Render boards as a PDF, one card per page.
+
+    Writes to output (any seekable binary file object) if given, otherwise to
+    a new BytesIO. Returns the file object rewound to the start.
+    """
+    if output is None:
+        output = BytesIO()
+
     doc = SimpleDocTemplate(
-        buffer,
+        output,
         pagesize=letter,
         topMargin=0.4 * inch,
         bottomMargin=0.4 * inch,
@@ -67,13 +92,15 @@ def generate_pdf(
         rightMargin=0.75 * inch,
     )
 
+    header_text_color = HexColor(header_color)
+
     title_style = ParagraphStyle(
         "title",
         alignment=TA_CENTER,
         fontSize=28,
         fontName="Helvetica-Bold",
         spaceAfter=6,
-        textColor=HexColor(header_color),
+        textColor=header_text_color,
     )
 
     church_style = ParagraphStyle(
@@ -82,7 +109,7 @@ def generate_pdf(
         fontSize=14,
         fontName="Helvetica",
         spaceAfter=4,
-        textColor=HexColor(header_color),
+        textColor=header_text_color,
     )
 
     card_num_style = ParagraphStyle(
@@ -128,11 +155,71 @@ def generate_pdf(
         leading=12,
     )
 
-    free_style = ParagraphStyle(
-        "free",
-        alignment=TA_CENTER,
-        fontSize=20,
-        fontName="Helvetica-Bold",
+    # Square cells sized to fit the page width
+    cell_sizes = _CELL_SIZES.get(board_size)
+    if cell_sizes is None:
+        cell_sizes = [_BOARD_WIDTH / board_size] * board_size
+
+    # Room for text inside a cell, after left and right padding
+    text_width = cell_sizes[0] - 6
+
+    # Indexed by "is this a long word?" for phrase cells
+    cell_styles = (cell_style, cell_style_small)
+    # Phrase Paragraphs by word; cells are all the same size, so one flowable
+    # per phrase can be laid out again on every card that uses it
+    phrase_cells = {}
+
+    # Table styling is the same for every card, so build it once
+    style_commands = [
+        # Grid
+        ("GRID", (0, 0), (-1, -1), 2, HexColor(border_color)),
+        # Center everything
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        # Reduce padding so text can be larger and closer to edges
+        ("LEFTPADDING", (0, 0), (-1, -1), 3),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 3),
+        ("TOPPADDING", (0, 0), (-1, -1), 2),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+        # Font for plain-string word cells (matches cell_style)
+        ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 0), (-1, -1), 14),
+        ("LEADING", (0, 0), (-1, -1), 16),
+    ]
+
+    # Free space in the center square (ParagraphStyle's default leading of 12)
+    if board_size == 5:
+        style_commands.extend([
+            ("FONTNAME", (2, 2), (2, 2), "Helvetica-Bold"),
+            ("FONTSIZE", (2, 2), (2, 2), 20),
+            ("LEADING", (2, 2), (2, 2), 12),
+        ])
+
+    # Alternate row backgrounds for readability (light gray on even data rows)
+    row_background = HexColor("#f8f9fa")
+    for i in range(1, board_size, 2):
+        style_commands.append(("BACKGROUND", (0, i), (-1, i), row_background))
+
+    table_style = TableStyle(style_commands)
+
+    # Load the logo once; the same flowable (and decoded image) is reused on every card
+    logo = None
+    if logo_path:
+        try:
+            stat = os.stat(logo_path)
+            png, draw_width, draw_height = _prepare_logo(
+                logo_path, stat.st_mtime_ns, stat.st_size
+            )
+            logo = Image(BytesIO(png), draw_width, draw_height)
+            logo.hAlign = "CENTER"
+        except Exception:
+            logo = None  # Skip logo if there's an issue
+
+    # Footer: optional date and occasion (the same on every card), then the
+    # card number. Only the number changes, so join the rest once.
+    formatted_date = format_date(card_date) if card_date else None
+    footer_prefix = "".join(
+        part + _FOOTER_SEP for part in (formatted_date, card_occasion) if part
     )
 
     story = []
@@ -140,22 +227,9 @@ def generate_pdf(
 
     for card_idx, board in enumerate(boards):
         # Logo
-        if logo_path:
-            try:
-                img = Image(logo_path)
-                # Scale to max 0.8 inch, maintain aspect ratio
-                aspect = img.imageWidth / img.imageHeight if img.imageHeight else 1
-                if aspect >= 1:
-                    img.drawWidth = 0.8 * inch
-                    img.drawHeight = 0.8 * inch / aspect
-                else:
-                    img.drawHeight = 0.8 * inch
-                    img.drawWidth = 0.8 * inch * aspect
-                img.hAlign = "CENTER"
-                story.append(img)
-                story.append(Spacer(1, 4))
-            except Exception:
-                pass  # Skip logo if there's an issue
+        if logo:
+            story.append(logo)
+            story.append(Spacer(1, 4))
 
         # Church name
         if church_name:
@@ -165,67 +239,47 @@ def generate_pdf(
         story.append(Paragraph(title, title_style))
         story.append(Spacer(1, 20))
 
-        # Build table data — square cells sized to fit page width
-        page_width = letter[0] - 1.5 * inch   # usable width after margins
-        cell_size = page_width / board_size
-
         table_data = []
+        small_cells = []  # (col, row) of long words that need the smaller font
 
-        # Board rows - wrap words in Paragraphs for text wrapping
-        for row in board:
+        # Board rows. Single words are plain strings styled by the table, which
+        # is much cheaper than a Paragraph per cell. Phrases, and words too
+        # wide for the cell, still get a Paragraph so they can wrap.
+        for row_idx, row in enumerate(board):
             row_data = []
-            for cell_val in row:
+            for col_idx, cell_val in enumerate(row):
                 if cell_val == "FREE":
-                    row_data.append(Paragraph("FREE", free_style))
+                    row_data.append("FREE")
+                    continue
+                word = cell_val.capitalize()
+                small = len(word) > 10
+                if " " in word or stringWidth(
+                    word, "Helvetica", cell_styles[small].fontSize
+                ) > text_width:
+                    phrase = phrase_cells.get(word)
+                    if phrase is None:
+                        phrase = phrase_cells[word] = Paragraph(word, cell_styles[small])
+                    row_data.append(phrase)
                 else:
-                    word = cell_val.capitalize()
-                    style = cell_style_small if len(word) > 10 else cell_style
-                    row_data.append(Paragraph(word, style))
+                    row_data.append(word)
+                    if small:
+                        small_cells.append((col_idx, row_idx))
             table_data.append(row_data)
 
-        col_widths = [cell_size] * board_size
-        # All rows same height as width so every cell is a perfect square
-        row_heights = [cell_size] * len(table_data)
-
-        table = Table(table_data, colWidths=col_widths, rowHeights=row_heights)
-
-        # Table styling
-        style_commands = [
-            # Grid
-            ("GRID", (0, 0), (-1, -1), 2, HexColor(border_color)),
-            # Center everything
-            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            # Reduce padding so text can be larger and closer to edges
-            ("LEFTPADDING", (0, 0), (-1, -1), 3),
-            ("RIGHTPADDING", (0, 0), (-1, -1), 3),
-            ("TOPPADDING", (0, 0), (-1, -1), 2),
-            ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
-        ]
-
-        # Alternate row backgrounds for readability (light gray on even data rows)
-        start_row = 0
-        for i in range(board_size):
-            actual_row = start_row + i
-            if i % 2 == 1:
-                style_commands.append(
-                    ("BACKGROUND", (0, actual_row), (-1, actual_row), HexColor("#f8f9fa"))
-                )
-
-        table.setStyle(TableStyle(style_commands))
+        table = Table(table_data, colWidths=cell_sizes, rowHeights=cell_sizes)
+        table.setStyle(table_style)
+        if small_cells:
+            # Matches cell_style_small
+            table.setStyle(TableStyle(
+                [("FONTSIZE", cell, cell, 10) for cell in small_cells]
+                + [("LEADING", cell, cell, 12) for cell in small_cells]
+            ))
         table.hAlign = "CENTER"
         story.append(table)
 
-        # Footer: card number, optional date, and optional occasion
-        footer_parts = []
-        if card_date:
-            footer_parts.append(format_date(card_date))
-        if card_occasion:
-            footer_parts.append(card_occasion)
-        footer_parts.append(f"Card {card_idx + 1} of {total_cards}")
-        story.append(
-            Paragraph(" &nbsp;&bull;&nbsp; ".join(footer_parts), card_num_style)
-        )
+        story.append(Paragraph(
+            f"{footer_prefix}Card {card_idx + 1} of {total_cards}", card_num_style
+        ))
 
         # Optional footer message
         if footer_message:
@@ -236,5 +290,37 @@ def generate_pdf(
             story.append(PageBreak())
 
     doc.build(story)
-    buffer.seek(0)
-    return buffer
+    output.seek(0)
+    return output
+
+
+@functools.lru_cache(maxsize=16)
+def _prepare_logo(logo_path, mtime_ns, size):
+    """Return (png_bytes, draw_width, draw_height) for a logo file.
+
+    The image is scaled to fit _LOGO_MAX_SIZE keeping its aspect ratio and
+    downsampled to _LOGO_DPI, so a large photo doesn't end up embedded in
+    the PDF at full resolution. mtime_ns and size are only part of the cache
+    key, so a replaced file is prepared again.
+    """
+    with PILImage.open(logo_path) as im:
+        im.load()
+        width, height = im.size
+        aspect = width / height if height else 1
+        if aspect >= 1:
+            draw_width, draw_height = _LOGO_MAX_SIZE, _LOGO_MAX_SIZE / aspect
+        else:
+            draw_width, draw_height = _LOGO_MAX_SIZE * aspect, _LOGO_MAX_SIZE
+
+        # thumbnail() only ever shrinks, so small logos keep their pixels
+        pixels_per_point = _LOGO_DPI / 72
+        im.thumbnail(
+            (max(1, round(draw_width * pixels_per_point)),
+             max(1, round(draw_height * pixels_per_point))),
+            PILImage.LANCZOS,
+        )
+        if im.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+            im = im.convert("RGBA" if "A" in im.mode else "RGB")
+        buffer = BytesIO()
+        im.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue(), draw_width, draw_height
@@ -1,7 +1,9 @@
 """Persists customization settings to a local JSON file so they carry over between sessions."""
 
-import json
 import os
+import tempfile
+
+import orjson
 
 SETTINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "saved_settings.json")
 
@@ -18,24 +20,54 @@ DEFAULTS = {
 PERSISTED_KEYS = ["title", "church_name", "header_color", "border_color", "footer_message"]
 
 
+# (mtime_ns, parsed contents) of SETTINGS_FILE, reused until the file's mtime
+# changes. Always replaced as a whole, so no reader sees a half-updated pair.
+_CACHE = (None, None)
+
+
 def load_settings():
     """Load saved settings from disk, merged with defaults."""
+    global _CACHE
     settings = dict(DEFAULTS)
-    if os.path.exists(SETTINGS_FILE):
+    try:
+        mtime = os.stat(SETTINGS_FILE).st_mtime_ns
+    except OSError:
+        return settings  # Nothing saved yet
+    cached_mtime, saved = _CACHE
+    if mtime != cached_mtime:
         try:
-            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-                saved = json.load(f)
-            settings.update(saved)
-        except (json.JSONDecodeError, OSError):
-            pass  # Corrupt file — just use defaults
+            with open(SETTINGS_FILE, "rb") as f:
+                saved = orjson.loads(f.read())
+        except (orjson.JSONDecodeError, OSError):
+            return settings  # Corrupt file — just use defaults
+        _CACHE = (mtime, saved)
+    settings.update(saved)
     return settings
 
 
 def save_settings(data):
     """Save the persistable customization settings to disk."""
+    global _CACHE
     to_save = {k: data.get(k, DEFAULTS.get(k, "")) for k in PERSISTED_KEYS}
+    # Write a temp file and swap it in, so a crash can't leave a truncated
+    # file. Each save gets its own temp file since every user shares this one.
+    tmp_path = None
     try:
-        with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(to_save, f, indent=2)
-    except OSError:
-        pass  # If we can't write, silently continue
+        raw = orjson.dumps(to_save, option=orjson.OPT_INDENT_2)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(SETTINGS_FILE), prefix=".saved_settings.", suffix=".tmp"
+        )
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+        # os.replace keeps the temp file's mtime; stat it first, as another
+        # save may replace SETTINGS_FILE again before we could stat that
+        mtime = os.stat(tmp_path).st_mtime_ns
+        os.replace(tmp_path, SETTINGS_FILE)
+        _CACHE = (mtime, to_save)
+    except (orjson.JSONEncodeError, OSError):
+        # If we can't write, silently continue
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
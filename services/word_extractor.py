@@ -1,8 +1,16 @@
-import json
+import functools
+import hashlib
 import re
-from collections import Counter
+import threading
+from collections import Counter, OrderedDict
 
 import anthropic
+import orjson
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None  # Fall back to regex tokenizing for long texts too
 
 from config import Config
 
@@ -53,7 +61,7 @@ Return a JSON array of approximately {target_count} words."""
 
 # Service structure words that are section labels in bulletins, not spoken content.
 # These get filtered out even if the AI returns them.
-SERVICE_SECTION_WORDS = {
+SERVICE_SECTION_WORDS = frozenset({
     "hymn", "hymns", "sermon", "prelude", "postlude", "offertory", "benediction",
     "doxology", "litany", "liturgy", "invocation", "processional", "recessional",
     "introit", "anthem", "interlude", "meditation", "responsive", "unison",
@@ -62,7 +70,30 @@ SERVICE_SECTION_WORDS = {
     "assurance", "confession", "pardon", "affirmation", "creed", "concerns",
     "joys", "dismissal", "charge", "choral", "response", "call", "worship",
     "opening", "closing", "prayer", "prayers", "old", "new",
-}
+})
+
+# Anthropic client shared across calls (see _get_client)
+_CLIENT = None
+_CLIENT_KEY = None
+
+# Markdown code fence (optionally tagged, e.g. ```json) wrapping the whole reply
+_FENCE_RE = re.compile(r"^```\w*\s*\n(.*?)\s*```$", re.S)
+
+# Fallback for AI responses that aren't valid JSON: pull out quoted words
+_QUOTED_WORD_RE = re.compile(r'"([a-zA-Z]{3,})"')
+
+# Words for frequency counting: letters and apostrophes only
+_TOKEN_RE = re.compile(r"[a-z']+")
+_TOKEN_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz'")
+
+# Texts at least this long are counted with a single Aho-Corasick pass
+_AHOCORASICK_MIN_CHARS = 20_000
+
+# Recent word counts keyed by (BLAKE2b digest of the text, target words). Only
+# the counts are kept, so scored bulletins don't stay alive in memory.
+_COUNT_CACHE = OrderedDict()
+_COUNT_CACHE_SIZE = 32
+_COUNT_LOCK = threading.Lock()
 
 
 def extract_words(bulletin_text, target_count=50):
@@ -71,19 +102,10 @@ def extract_words(bulletin_text, target_count=50):
             "Anthropic API key not configured. Please add your key to the .env file."
         )
 
-    client = anthropic.Anthropic(api_key=Config.ANTHROPIC_API_KEY)
-
-    min_count = max(20, target_count - 10)
-    max_count = target_count + 15
-
-    message = client.messages.create(
+    message = _get_client().messages.create(
         model="claude-sonnet-4-20250514",
         max_tokens=1024,
-        system=SYSTEM_PROMPT.format(
-            target_count=target_count,
-            min_count=min_count,
-            max_count=max_count,
-        ),
+        system=_system_prompt(target_count),
         messages=[
             {
                 "role": "user",
@@ -99,32 +121,53 @@ def extract_words(bulletin_text, target_count=50):
 
     # Parse JSON from response, handling potential markdown code fences
     cleaned = response_text.strip()
-    if cleaned.startswith("```"):
-        cleaned = cleaned.split("\n", 1)[1]
-        cleaned = cleaned.rsplit("```", 1)[0]
-    cleaned = cleaned.strip()
+    fenced = _FENCE_RE.match(cleaned)
+    if fenced:
+        cleaned = fenced.group(1)
 
     try:
-        words = json.loads(cleaned)
-    except json.JSONDecodeError:
+        words = orjson.loads(cleaned)
+    except orjson.JSONDecodeError:
         # Fallback: try to extract quoted strings
-        words = re.findall(r'"([a-zA-Z]{3,})"', response_text)
+        words = _QUOTED_WORD_RE.findall(response_text)
         if not words:
             raise ValueError(
                 "Could not parse word list from AI response. Please try again or add words manually."
             )
 
     # Deduplicate, lowercase, and filter out service section words
-    seen = set()
-    unique = []
-    for w in words:
-        w_lower = w.strip().lower()
-        if (w_lower and w_lower not in seen and len(w_lower) >= 3
-                and w_lower not in SERVICE_SECTION_WORDS):
-            seen.add(w_lower)
-            unique.append(w_lower)
+    # (dict.fromkeys keeps the first occurrence of each word, in order)
+    lowered = (w.strip().lower() for w in words)
+    return list(dict.fromkeys(
+        w for w in lowered if len(w) >= 3 and w not in SERVICE_SECTION_WORDS
+    ))
+
 
-    return unique
+def _get_client():
+    """Return a shared Anthropic client, rebuilt only if the API key changes.
+
+    Reusing one client keeps its connection pool alive, so each request
+    doesn't pay for a new TCP and TLS handshake.
+    """
+    global _CLIENT, _CLIENT_KEY
+    if _CLIENT is None or _CLIENT_KEY != Config.ANTHROPIC_API_KEY:
+        _CLIENT = anthropic.Anthropic(api_key=Config.ANTHROPIC_API_KEY)
+        _CLIENT_KEY = Config.ANTHROPIC_API_KEY
+    return _CLIENT
+
+
+@functools.lru_cache(maxsize=8)
+def _system_prompt(target_count):
+    """Return SYSTEM_PROMPT filled in for target_count.
+
+    It only depends on target_count, so it is formatted once per count
+    rather than once per request.
+    """
+    return SYSTEM_PROMPT.format(
+        target_count=target_count,
+        min_count=max(20, target_count - 10),
+        max_count=target_count + 15,
+    )
 
 
 def compute_word_frequencies(text, words):
@@ -133,14 +176,66 @@ def compute_word_frequencies(text, words):
     Uses case-insensitive whole-word matching so 'grace' matches 'Grace'
     but not 'disgrace'.
     """
-    text_lower = text.lower()
-    # Tokenize the text into words (letters and apostrophes only)
-    tokens = re.findall(r"[a-z']+", text_lower)
-    token_counts = Counter(tokens)
-
-    frequencies = {}
-    for word in words:
-        w = word.lower()
-        frequencies[w] = token_counts.get(w, 0)
-
-    return frequencies
+    targets = tuple(sorted({w.lower() for w in words}))
+    digest = hashlib.blake2b(
+        text.encode("utf-8", "surrogatepass"), digest_size=16
+    ).digest()
+    key = (digest, targets)
+    with _COUNT_LOCK:
+        counts = _COUNT_CACHE.get(key)
+        if counts is not None:
+            _COUNT_CACHE.move_to_end(key)
+    if counts is None:
+        counts = _count_words(text, targets)
+        with _COUNT_LOCK:
+            _COUNT_CACHE[key] = counts
+            while len(_COUNT_CACHE) > _COUNT_CACHE_SIZE:
+                _COUNT_CACHE.popitem(last=False)
+    return {w.lower(): counts[w.lower()] for w in words}
+
+
+def _count_words(text, targets):
+    """Return {word: count} for a tuple of lowercase target words."""
+    # Skip the copy when the text is already lowercase
+    text_lower = text if text.islower() else text.lower()
+    if ahocorasick is not None and len(text_lower) >= _AHOCORASICK_MIN_CHARS:
+        return _count_words_ahocorasick(text_lower, targets)
+
+    # Tokenize the text into words and count only the ones we're asked about.
+    # filter() with the set's own __contains__ keeps the per-token test in C.
+    wanted = frozenset(targets)
+    token_counts = Counter(filter(wanted.__contains__, _TOKEN_RE.findall(text_lower)))
+    return {w: token_counts.get(w, 0) for w in targets}
+
+
+def _count_words_ahocorasick(text_lower, targets):
+    """Count whole-word hits of targets with one multi-pattern scan of the text.
+
+    A hit only counts when it isn't part of a longer token, so the results
+    match the regex tokenizer exactly.
+    """
+    counts = dict.fromkeys(targets, 0)
+    automaton = _build_automaton(targets)
+    if automaton is None:
+        return counts
+    last = len(text_lower) - 1
+    for end, word in automaton.iter(text_lower):
+        start = end - len(word) + 1
+        if ((start == 0 or text_lower[start - 1] not in _TOKEN_CHARS)
+                and (end == last or text_lower[end + 1] not in _TOKEN_CHARS)):
+            counts[word] += 1
+    return counts
+
+
+@functools.lru_cache(maxsize=32)
+def _build_automaton(targets):
+    """Return an Aho-Corasick automaton for the targets, or None if none can match."""
+    automaton = ahocorasick.Automaton()
+    for word in targets:
+        # Words the tokenizer could never produce (e.g. hyphenated) never count
+        if _TOKEN_RE.fullmatch(word):
+            automaton.add_word(word, word)
+    if len(automaton) == 0:
+        return None
+    automaton.make_automaton()
+    return automaton